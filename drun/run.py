@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
-import argparse, os, subprocess, shutil
+import argparse, asyncio, functools, hashlib, http.client, itertools, json, os, socket, socketserver, subprocess, shutil, threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
 from enum import Enum, auto
 
 class Op(Enum):
@@ -20,141 +22,475 @@ PROJ = ROOT/"projects"
 
 ENV = {k: os.getenv(f"DOCKER_{k}", v) for k,v in {
   "USER": "developer", "PASS": "password", "WORKSPACE": "./workspace",
-  "ROOT": "0", "PORTS": "", "STARTUP": None, "DEBUG": "0"
+  "ROOT": "0", "PORTS": "", "STARTUP": None, "DEBUG": "0", "BUILD_CACHE": None,
+  "HOST_NET": "0"
 }.items()}
 
+@dataclass(frozen=True)
+class Defaults:
+  """ENV parsed once, so building many Docker objects is plain assignment."""
+  user: str
+  pwd: str
+  ws: str
+  script: Optional[str]
+  root: bool
+  debug: int
+  cache: Optional[str]
+  host_net: bool
+  ports: Tuple[Tuple[int, int], ...]
+
+def env_int(k: str) -> int:
+  try: return int(ENV[k])
+  except ValueError: raise ValueError(f"DOCKER_{k} must be an integer, got {ENV[k]!r}") from None
+
+@functools.lru_cache(maxsize=None)
+def defaults() -> Defaults:
+  """Parsed on first use rather than at import, so a bad variable can't break --help."""
+  try: ports = tuple((int(h), int(c)) for p in ENV["PORTS"].split(",") if p for h,c in [p.split(":")])
+  except ValueError:
+    raise ValueError(f"DOCKER_PORTS must be host:container[,...], got {ENV['PORTS']!r}") from None
+  return Defaults(
+    user=ENV["USER"],
+    pwd=ENV["PASS"],
+    ws=os.path.abspath(ENV["WORKSPACE"]),
+    script=ENV["STARTUP"],
+    root=bool(env_int("ROOT")),
+    debug=env_int("DEBUG"),
+    cache=ENV["BUILD_CACHE"],
+    host_net=bool(env_int("HOST_NET")),
+    ports=ports
+  )
+
+def engine_sock() -> Optional[str]:
+  """Socket of the engine the docker CLI talks to, None if that isn't a local unix socket.
+
+  Follows the CLI's precedence: DOCKER_HOST, then DOCKER_CONTEXT, then currentContext
+  in the CLI config. Any context other than "default" (rootless, Docker Desktop, ssh)
+  is left to the CLI rather than guessing its endpoint."""
+  host = os.getenv("DOCKER_HOST")
+  if host: return host[len("unix://"):] if host.startswith("unix://") else None
+  ctx = os.getenv("DOCKER_CONTEXT")
+  if ctx is None:
+    cfg = Path(os.getenv("DOCKER_CONFIG") or Path.home()/".docker")/"config.json"
+    try: conf = json.loads(cfg.read_text())
+    except (OSError, ValueError): conf = {}
+    ctx = conf.get("currentContext") if isinstance(conf, dict) else None
+  return "/var/run/docker.sock" if ctx in (None, "", "default") else None
+
+# Engine API socket; None sends every call through the docker CLI
+SOCK = engine_sock()
+
+# Control socket of `drun daemon`, which serves cached container states. Prefer the
+# per-user runtime dir; /tmp is shared, so clients also check the socket's owner.
+# Named after the engine socket, so a client only finds a daemon tracking its engine.
+DSOCK = os.getenv("DRUN_SOCK") or os.path.join(
+  os.getenv("XDG_RUNTIME_DIR") or "/tmp",
+  f"drun-{os.getuid()}-{hashlib.blake2b(str(SOCK).encode(), digest_size=4).hexdigest()}.sock")
+
+# Lifecycle ops as Engine API endpoints and their CLI flags, keyed by CLI verb.
+# rm is forced (stops a running container) and drops anonymous volumes.
+API = {
+  "start": ("POST", "/containers/{}/start", ()),
+  "stop": ("POST", "/containers/{}/stop", ()),
+  "restart": ("POST", "/containers/{}/restart", ()),
+  "rm": ("DELETE", "/containers/{}?force=1&v=1", ("-fv",)),
+  "rmi": ("DELETE", "/images/{}", ()),
+}
+
+class APIError(Exception):
+  def __init__(self, status: int, body: Any):
+    self.status = status
+    super().__init__(f"HTTP {status}: {body.get('message') if isinstance(body, dict) else body}")
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+  def __init__(self, path: str):
+    super().__init__("localhost")
+    self.path = path
+
+  def connect(self):
+    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self.sock.connect(self.path)
+
+# One kept-alive connection per thread; main() runs containers on worker threads
+_local = threading.local()
+
+def api(method: str, path: str) -> Optional[Tuple[int, Any]]:
+  """One request over a kept-alive socket connection; None if the socket is unreachable."""
+  conn = getattr(_local, "conn", None)
+  if conn is None:
+    conn = _local.conn = False
+    if SOCK:
+      try:
+        c = UnixHTTPConnection(SOCK)
+        c.connect()
+        conn = _local.conn = c
+      except OSError: pass
+  if not conn: return None
+  conn.request(method, path)
+  r = conn.getresponse()
+  body = r.read()
+  return r.status, json.loads(body) if body else None
+
+# Resolved once. subprocess only takes its posix_spawn fast path (no fork of this
+# process) when the executable has a directory part and close_fds is False. Not
+# closing fds is safe: Python opens fds non-inheritable (PEP 446), so the API
+# socket and daemon connections never reach the child.
+DOCKER = shutil.which("docker")
+
+def cli(argv: List[str], **kw) -> subprocess.CompletedProcess:
+  """Run a docker CLI argv (argv[0] == "docker") via posix_spawn where possible."""
+  return subprocess.run(argv, executable=DOCKER, close_fds=False, **kw)
+
+def ask_daemon(name: str) -> Optional[Tuple[bool, bool]]:
+  """(exists, running) from a running `drun daemon`, None if there is none."""
+  if not SOCK: return None  # the daemon only tracks a local socket engine
+  try:
+    if os.stat(DSOCK).st_uid != os.getuid(): return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+      s.settimeout(1)
+      s.connect(DSOCK)
+      s.sendall(f"{name}\n".encode())
+      exists, running = s.makefile().readline().split()
+      return exists == "1", running == "1"
+  except (OSError, ValueError): return None
+
+def scan(path: str) -> Iterator[Tuple[str, int, int]]:
+  """(path, mtime_ns, size) of every file below path."""
+  with os.scandir(path) as it:
+    for e in it:
+      if e.is_dir(follow_symlinks=False): yield from scan(e.path)
+      else:
+        st = e.stat(follow_symlinks=False)
+        yield e.path, st.st_mtime_ns, st.st_size
+
+class Engine:
+  """Docker access used by Docker: the daemon cache and Engine API where reachable,
+  the docker CLI otherwise. Tests substitute an in-memory engine with the same methods."""
+  # Fixed CLI argv prefixes; the container/image name is appended per call
+  _INSPECT = ("docker", "container", "inspect", "--format", "{{.Name}} {{.State.Running}}")
+  _IMAGE_FP = ("docker", "image", "inspect", "--format", '{{index .Config.Labels "drun.fp"}}')
+
+  def cached_state(self, name: str) -> Optional[Tuple[bool, bool]]:
+    """(exists, running) from `drun daemon`, which may lag the engine by a few events."""
+    return ask_daemon(name)
+
+  def state(self, name: str) -> Tuple[bool, bool]:
+    """(exists, running) from one inspect over the API or a single CLI call."""
+    r = api("GET", f"/containers/{quote(name)}/json")
+    if r is not None:
+      if r[0] not in (200, 404): raise APIError(*r)
+      # Lookups also match ID prefixes; only the exact name counts
+      exists = r[0] == 200 and r[1].get("Name") == f"/{name}"
+      return exists, exists and r[1]["State"]["Running"]
+    try:
+      proc = cli([*self._INSPECT, name], capture_output=True, text=True)
+      found, _, running = proc.stdout.strip().partition(" ")
+      exists = proc.returncode == 0 and found == f"/{name}"
+      return exists, exists and running == "true"
+    except: return False, False
+
+  def image_fp(self, name: str) -> Optional[str]:
+    """drun.fp label of the built image, None if there is no image."""
+    r = api("GET", f"/images/{quote(name)}/json")
+    if r is not None:
+      if r[0] == 404: return None
+      if r[0] >= 400: raise APIError(*r)
+      return (r[1]["Config"].get("Labels") or {}).get("drun.fp", "")
+    proc = cli([*self._IMAGE_FP, name], capture_output=True, text=True)
+    return proc.stdout.strip() if proc.returncode == 0 else None
+
+  def ctl(self, cmd: str, name: str):
+    method, path, flags = API[cmd]
+    r = api(method, path.format(quote(name)))
+    if r is None: cli(["docker", cmd, *flags, name], check=True)
+    elif r[0] >= 400: raise APIError(*r)
+
+  def build(self, argv: List[str]):
+    cli(argv, check=True, env={**os.environ, "DOCKER_BUILDKIT": "1"})
+
+  def run(self, argv: List[str]):
+    cli(argv, check=True)
+
+  def exec(self, name: str, script: str):
+    cli(["docker", "exec", name, "bash", "-c", script], check=True)
+
 class Docker:
   def __init__(self, name: str, op: Op, user=None, pwd=None, ws=None,
-               script=None, ports=None, root=None, debug=0):
+               script=None, ports=None, root=None, debug=0, cache=None,
+               host_net=None, no_build=False, link_tmpl=False, engine=None):
     self.name = name
     self.op = op
-    self.user = user or ENV["USER"]
-    self.pwd = pwd or ENV["PASS"]
-    self.ws = os.path.abspath(ws or ENV["WORKSPACE"])
-    self.script = script or ENV["STARTUP"]
-    self.root = root if root is not None else bool(int(ENV["ROOT"]))
-    self.debug = int(ENV["DEBUG"]) if debug == 0 else debug
+    d = defaults()
+    self.user = user or d.user
+    self.pwd = pwd or d.pwd
+    self.ws = os.path.abspath(ws) if ws else d.ws
+    self.script = script or d.script
+    self.root = root if root is not None else d.root
+    self.debug = d.debug if debug == 0 else debug
+    self.cache = cache or d.cache
+    self.host_net = host_net if host_net is not None else d.host_net
+    self.ports = ports or d.ports
+    self.no_build = no_build
+    self.link_tmpl = link_tmpl
+    self.engine = engine or Engine()
     self.dir = PROJ/name
     self.df = self.dir/"Dockerfile"
-
-    self.ports = ports or []
-    if not ports and ENV["PORTS"]:
-      self.ports = [tuple(map(int, p.split(":"))) for p in ENV["PORTS"].split(",")]
+    self._have_df = False
+    self._known = False, False
 
   def dbg(self, lvl: int, msg: str):
     if self.debug >= lvl: print(f"[DEBUG-{lvl}] {msg}")
 
   def setup(self):
-    if not self.dir.exists():
-      self.dir.mkdir(parents=True)
-    if not self.df.exists():
-      shutil.copy2(TMPL/"Dockerfile.template", self.df)
+    # One stat: an existing Dockerfile implies its directory exists too
+    try: os.stat(self.df)
+    except FileNotFoundError:
+      self.dir.mkdir(parents=True, exist_ok=True)
+      # A hardlink shares the template's inode: in-place edits would change it everywhere
+      if self.link_tmpl:
+        try: os.link(TMPL/"Dockerfile.template", self.df)
+        except OSError: shutil.copy2(TMPL/"Dockerfile.template", self.df)
+      else: shutil.copy2(TMPL/"Dockerfile.template", self.df)
       self.dbg(2, f"Created Dockerfile in {self.dir}")
+    self._have_df = True
 
-  def exists(self) -> bool:
-    try: return self.name in subprocess.run(
-      ["docker", "ps", "-a", "--filter", f"name=^{self.name}$", "--format", "{{.Names}}"],
-      capture_output=True, text=True).stdout
-    except: return False
+  def fingerprint(self) -> str:
+    """Hash of everything the build depends on: Dockerfile, build args, context."""
+    h = hashlib.blake2b(self.df.read_bytes(), digest_size=16)
+    h.update(f"\0{self.user}\0{self.pwd}".encode())
+    for entry in sorted(scan(str(self.dir))): h.update(repr(entry).encode())
+    return h.hexdigest()
 
-  def running(self) -> bool:
-    try: return self.name in subprocess.run(
-      ["docker", "ps", "--filter", f"name=^{self.name}$", "--format", "{{.Names}}"],
-      capture_output=True, text=True).stdout
-    except: return False
+  def build_cmd(self, fp: str = "") -> List[str]:
+    # Local cache export needs a buildx builder other than the default docker driver,
+    # and such builders keep the result in their own cache unless asked to --load it
+    cache = [f"--cache-from=type=local,src={self.cache}",
+             f"--cache-to=type=local,dest={self.cache},mode=max", "--load"] if self.cache else []
+    return ["docker", "build",
+      "--build-arg", f"USERNAME={self.user}",
+      "--build-arg", f"USER_PASSWORD={self.pwd}",
+      "--label", f"drun.fp={fp}", *cache,
+      "-t", self.name, "-f", str(self.df), str(self.dir)]
 
-  def build(self) -> bool:
+  def build(self, fp: str = "") -> bool:
     self.dbg(2, f"Building from {self.df}...")
     try:
-      subprocess.run(["docker", "build",
-        "--build-arg", f"USERNAME={self.user}",
-        "--build-arg", f"USER_PASSWORD={self.pwd}",
-        "-t", self.name, "-f", str(self.df), str(self.dir)], check=True)
+      self.engine.build(self.build_cmd(fp))
       self.dbg(2, "Build OK")
       return True
     except Exception as e:
-      print(f"Build failed: {e}")
+      print(f"Build failed for {self.name}: {e}")
       return False
 
   def run_cmd(self) -> List[str]:
     cmd = ["docker", "run", "-d", "--name", self.name]
-    cmd.extend(sum([("-p", f"{h}:{c}") for h,c in self.ports], ()))
+    # Host networking needs no -p forwards, and so no docker-proxy per port
+    if self.host_net: cmd.append("--network=host")
+    else: cmd.extend(itertools.chain.from_iterable(("-p", f"{h}:{c}") for h,c in self.ports))
     cmd.extend(["-v", f"{self.ws}:/home/{self.user}/workspace"])
     if not self.root: cmd.extend(["-u", self.user])
     return cmd + [self.name]
 
   def clear_cache(self):
     try:
-      subprocess.run(["docker", "exec", self.name, "sync"], check=True)
-      subprocess.run(["docker", "exec", self.name, "bash", "-c",
-                    "echo 3 > /proc/sys/vm/drop_caches"], check=True)
+      self.engine.exec(self.name, "sync && echo 3 > /proc/sys/vm/drop_caches")
       self.dbg(2, "Cache cleared")
-    except Exception as e: print(f"Cache clear failed: {e}")
+    except Exception as e: print(f"Cache clear failed for {self.name}: {e}")
 
   def create(self):
-    if not self.df.exists():
+    if not (self._have_df or self.df.exists()):
       print(f"No Dockerfile at {self.df}")
       return
-    os.makedirs(self.ws, exist_ok=True)
-    if not self.build(): return
-    subprocess.run(self.run_cmd(), check=True)
+    # Tries mkdir first, so an existing workspace costs one EEXIST and no ancestor stats
+    Path(self.ws).mkdir(parents=True, exist_ok=True)
+    have = self.engine.image_fp(self.name)
+    if have is not None and self.no_build: self.dbg(2, f"Reusing image {self.name}")
+    else:
+      fp = self.fingerprint()
+      if have == fp: self.dbg(2, f"Image {self.name} up to date, skipping build")
+      elif not self.build(fp): return
+    self.engine.run(self.run_cmd())
     if self.script:
-      subprocess.run(["docker", "exec", self.name, "bash", "-c",
-        f"cd /home/{self.user}/workspace && ./{self.script}"], check=True)
+      self.engine.exec(self.name, f"cd /home/{self.user}/workspace && ./{self.script}")
+
+  def _start(self): self.engine.ctl("start", self.name)
+
+  def _stop(self): self.engine.ctl("stop", self.name)
+
+  def _restart(self): self.engine.ctl("restart", self.name)
+
+  def _clean(self):
+    self.clear_cache()
+    self.engine.ctl("restart", self.name)
+
+  def _reset(self):
+    if self._known[0]: self.engine.ctl("rm", self.name)
+    self.create()
+
+  def _nuke(self):
+    if self._known[0]: self.engine.ctl("rm", self.name)
+    self.engine.ctl("rmi", self.name)
+    self.create()
+
+  def refusal(self, exists: bool, running: bool) -> Optional[str]:
+    """Why self.op can't run in this state, None if it can."""
+    cond, msg = {
+      Op.CREATE: (exists, "exists. Use 'start' or 'reset'."),
+      Op.START: (not exists or running, "not found" if not exists else "running"),
+      Op.STOP: (not exists or not running, "not found" if not exists else "not running"),
+      Op.RESTART: (not exists, "not found. Use 'create'."),
+      Op.CLEAN: (not exists, "not found. Use 'create'.")
+    }.get(self.op, (False, ""))
+    return msg if cond else None
 
   def run(self):
     try:
       self.setup()
-      exists = self.exists()
-      running = self.running()
-
-      checks = {
-        (Op.CREATE, exists): "exists. Use 'start' or 'reset'.",
-        (Op.START, not exists or running): "'not found' if not exists else 'running'",
-        (Op.STOP, not exists or not running): "'not found' if not exists else 'not running'",
-        (Op.RESTART, not exists): "not found. Use 'create'.",
-        (Op.CLEAN, not exists): "not found. Use 'create'."
-      }
-
-      for (op, cond), msg in checks.items():
-        if self.op == op and cond:
-          print(f"Container {self.name} {eval(msg) if '{' in msg else msg}")
-          return
-
-      ops = {
-        Op.CREATE: lambda: self.create(),
-        Op.START: lambda: subprocess.run(["docker", "start", self.name], check=True),
-        Op.STOP: lambda: subprocess.run(["docker", "stop", self.name], check=True),
-        Op.RESTART: lambda: subprocess.run(["docker", "restart", self.name], check=True),
-        Op.CLEAN: lambda: [self.clear_cache(), subprocess.run(["docker", "restart", self.name], check=True)],
-        Op.RESET: lambda: [subprocess.run(["docker", "stop" if running else "rm", self.name], check=True) if exists else None, self.create()],
-        Op.NUKE: lambda: [subprocess.run(["docker", "stop" if running else "rm", self.name],
-          check=True) if exists else None, subprocess.run(["docker", "rmi", self.name],
-          check=True), self.create()]
-      }[self.op]()
-
-      print(f"Operation '{self.op.name.lower()}' completed!")
+      cached = self.engine.cached_state(self.name)
+      exists, running = cached or self.engine.state(self.name)
+      refusal = self.refusal(exists, running)
+      # The daemon cache is only trusted to let an op through; refusing, and the
+      # rm decision in RESET/NUKE, are confirmed against the engine
+      if cached and (refusal or self.op in (Op.RESET, Op.NUKE)):
+        exists, running = self.engine.state(self.name)
+        refusal = self.refusal(exists, running)
+      if refusal:
+        print(f"Container {self.name} {refusal}")
+        return
+
+      self._known = exists, running
+      OP_TABLE[self.op](self)
+
+      print(f"Operation '{self.op.name.lower()}' on {self.name} completed!")
 
     except Exception as e:
-      print(f"{'Error during' if isinstance(e, subprocess.CalledProcessError) else 'Unexpected'} error: {e}")
+      print(f"{'Error during' if isinstance(e, (subprocess.CalledProcessError, APIError)) else 'Unexpected'} error on {self.name}: {e}")
+
+# Op dispatch, built once; RESET/NUKE read the (exists, running) run() saw
+OP_TABLE: Dict[Op, Callable[[Docker], None]] = {
+  Op.CREATE: Docker.create,
+  Op.START: Docker._start,
+  Op.STOP: Docker._stop,
+  Op.RESTART: Docker._restart,
+  Op.CLEAN: Docker._clean,
+  Op.RESET: Docker._reset,
+  Op.NUKE: Docker._nuke
+}
+
+class Daemon:
+  """Mirrors container states from the engine event stream and serves them on DSOCK."""
+  def __init__(self):
+    self._states: Dict[str, Tuple[bool, bool]] = {}
+
+  def apply(self, ev: dict):
+    attrs = ev.get("Actor", {}).get("Attributes", {})
+    name, action = attrs.get("name"), ev.get("Action", "")
+    if not name: return
+    if action == "destroy": self._states.pop(name, None)
+    elif action == "rename":
+      self._states[name] = self._states.pop(attrs.get("oldName", "").lstrip("/"), (True, False))
+    elif action in ("start", "unpause"): self._states[name] = (True, True)
+    elif action in ("create", "die"): self._states[name] = (True, False)
+
+  def seed(self, containers: List[dict]):
+    # Paused and restarting count as running, matching inspect's State.Running
+    for c in containers:
+      for n in c["Names"]:
+        self._states[n.lstrip("/")] = (True, c["State"] in ("running", "paused", "restarting"))
+
+  def listen(self, path: str) -> socketserver.ThreadingUnixStreamServer:
+    """Serve name lookups on path from a background thread."""
+    states = self._states
+    class Handler(socketserver.StreamRequestHandler):
+      def handle(self):
+        exists, running = states.get(self.rfile.readline().decode().strip(), (False, False))
+        self.wfile.write(f"{int(exists)} {int(running)}\n".encode())
+
+    srv = socketserver.ThreadingUnixStreamServer(path, Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+  def serve(self):
+    if not SOCK:
+      print("Daemon needs a local unix:// engine socket (DOCKER_HOST or the default context)")
+      return
+    # Take over only a stale socket, never one a live daemon still answers on
+    try:
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s: s.connect(DSOCK)
+      print(f"Daemon already running on {DSOCK}")
+      return
+    except FileNotFoundError: pass
+    except ConnectionRefusedError:
+      try: os.unlink(DSOCK)
+      except OSError as e:
+        print(f"Daemon can't use {DSOCK}: {e}")
+        return
+    except OSError as e:
+      print(f"Daemon can't use {DSOCK}: {e}")
+      return
+
+    # Subscribe before listing so no transition between the two is lost
+    try:
+      events = UnixHTTPConnection(SOCK)
+      events.request("GET", "/events?filters=" + quote(json.dumps({"type": ["container"]})))
+      stream = events.getresponse()
+      listing = api("GET", "/containers/json?all=1")
+    except OSError as e:
+      print(f"Daemon can't reach the engine at {SOCK}: {e}")
+      return
+    if listing is None or listing[0] != 200:
+      print(f"Daemon can't list containers at {SOCK}")
+      return
+    self.seed(listing[1])
+
+    try: srv = self.listen(DSOCK)
+    except OSError as e:
+      print(f"Daemon can't use {DSOCK}: {e}")
+      return
+    print(f"Daemon on {DSOCK}, tracking {len(self._states)} containers")
+    try:
+      for line in stream:
+        if line.strip(): self.apply(json.loads(line))
+      print(f"Engine event stream at {SOCK} closed, daemon exiting")
+    except KeyboardInterrupt: pass
+    finally:
+      srv.server_close()
+      os.unlink(DSOCK)
+
+async def run_all(dockers: List[Docker]):
+  # Docker.run() blocks on subprocesses and the socket, so threads overlap those waits
+  sem = asyncio.Semaphore(os.cpu_count() or 1)
+  async def _run_one(d: Docker):
+    async with sem: await asyncio.to_thread(d.run)
+  await asyncio.gather(*map(_run_one, dockers))
 
 def main():
   p = argparse.ArgumentParser(description="Docker container management")
-  p.add_argument("operation", choices=[op.name.lower() for op in Op])
-  p.add_argument("container_name")
+  p.add_argument("operation", choices=[op.name.lower() for op in Op] + ["daemon"])
+  p.add_argument("container_name", nargs="*")
   p.add_argument("--username", help="Container username (env: DOCKER_USER)")
   p.add_argument("--password", help="User password (env: DOCKER_PASS)")
   p.add_argument("--workspace", help="Local workspace path (env: DOCKER_WORKSPACE)")
   p.add_argument("--startup-script", help="Startup script (env: DOCKER_STARTUP)")
   p.add_argument("--ports", nargs="+", help="Port forwards host:container (env: DOCKER_PORTS)")
   p.add_argument("--root", action="store_true", help="Root mode (env: DOCKER_ROOT)")
+  p.add_argument("--host-net", action="store_true", help="Host networking instead of port forwards (env: DOCKER_HOST_NET)")
+  p.add_argument("--no-build", action="store_true", help="Reuse an existing image even if the Dockerfile changed")
+  p.add_argument("--link-template", action="store_true", help="Hardlink a new project's Dockerfile to the template instead of copying it")
+  p.add_argument("--build-cache", help="Local BuildKit cache dir, needs a 'docker buildx create --use' builder (env: DOCKER_BUILD_CACHE)")
   p.add_argument("--debug", type=int, choices=range(5), default=0)
 
   args = p.parse_args()
+  if args.operation == "daemon":
+    if args.container_name: p.error("daemon takes no container names")
+    return Daemon().serve()
+  if not args.container_name: p.error("container_name is required")
   ports = [(int(h),int(c)) for p in (args.ports or []) for h,c in [p.split(":")]]
 
-  Docker(
-    name=args.container_name,
+  try: defaults()
+  except ValueError as e: p.error(str(e))
+  dockers = [Docker(
+    name=name,
     op=Op[args.operation.upper()],
     user=args.username,
     pwd=args.password,
@@ -162,8 +498,14 @@ def main():
     script=args.startup_script,
     ports=ports,
     root=args.root,
-    debug=args.debug
-  ).run()
+    debug=args.debug,
+    cache=args.build_cache,
+    host_net=args.host_net or None,
+    no_build=args.no_build,
+    link_tmpl=args.link_template
+  ) for name in dict.fromkeys(args.container_name)]  # a repeated name would race itself
+  if len(dockers) == 1: dockers[0].run()
+  else: asyncio.run(run_all(dockers))
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
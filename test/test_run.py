@@ -1,23 +1,68 @@
+import asyncio
 import unittest
 from unittest.mock import patch, MagicMock, call
 import sys
 from pathlib import Path
 import shutil
 import os
+import socket
+import tempfile
+import threading
+import time
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
-from drun.run import Docker, Op
+from drun.run import APIError, Daemon, Docker, Engine, Op, ENV, TMPL, ask_daemon, defaults, engine_sock, main, run_all
+
+class FakeEngine:
+  """Dict-backed stand-in for Engine; records every side effect in self.log."""
+  def __init__(self, containers=None, images=None):
+    self.containers = dict(containers or {})  # name -> running
+    self.images = dict(images or {})          # name -> drun.fp label
+    self.log = []
+
+  cache = None  # name -> (exists, running) as a possibly stale daemon would report
+
+  def cached_state(self, name):
+    return self.cache.get(name) if self.cache is not None else None
+
+  def state(self, name):
+    self.log.append(("state", name))
+    return name in self.containers, self.containers.get(name, False)
+
+  def image_fp(self, name):
+    return self.images.get(name)
+
+  def ctl(self, cmd, name):
+    self.log.append((cmd, name))
+    if cmd == "rm": del self.containers[name]
+    elif cmd == "rmi": del self.images[name]
+    else: self.containers[name] = cmd != "stop"
+
+  def build(self, argv):
+    name = argv[argv.index("-t") + 1]
+    self.images[name] = next(a for a in argv if a.startswith("drun.fp=")).split("=", 1)[1]
+    self.log.append(("build", name))
+
+  def run(self, argv):
+    name = argv[argv.index("--name") + 1]
+    self.containers[name] = True
+    self.log.append(("run", name))
+
+  def exec(self, name, script):
+    self.log.append(("exec", name, script))
 
 class TestDockerManager(unittest.TestCase):
   def setUp(self):
     self.test_dir = Path("test_workspace")
+    self.engine = FakeEngine()
     self.docker = Docker(
       name="test-container",
       op=Op.CREATE,
       user="testuser",
       pwd="testpass",
       ws=str(self.test_dir),
-      debug=2
+      debug=2,
+      engine=self.engine
     )
     # Create test workspace
     self.test_dir.mkdir(exist_ok=True)
@@ -29,142 +74,125 @@ class TestDockerManager(unittest.TestCase):
     if self.docker.dir.exists():
       shutil.rmtree(self.docker.dir)
 
-  @patch('subprocess.run')
-  def test_container_state_checks(self, mock_run):
-    # Test container existence check
-    mock_run.return_value = MagicMock(stdout="test-container\n")
-    self.assertTrue(self.docker.exists())
-
-    mock_run.return_value = MagicMock(stdout="")
-    self.assertFalse(self.docker.exists())
-
-    # Test running state check
-    mock_run.return_value = MagicMock(stdout="test-container\n")
-    self.assertTrue(self.docker.running())
-
-    mock_run.return_value = MagicMock(stdout="")
-    self.assertFalse(self.docker.running())
+  def run_op(self, op, containers=None, images=None):
+    self.engine.containers.update(containers or {})
+    self.engine.images.update(images or {})
+    self.docker.op = op
+    self.docker.run()
+    return [e for e in self.engine.log if e[0] != "state"]
 
-  @patch('subprocess.run')
   @patch('shutil.copy2')
-  def test_setup(self, mock_copy, mock_run):
+  def test_setup(self, mock_copy):
     self.docker.setup()
     mock_copy.assert_called_once()
     self.assertTrue(self.docker.dir.exists())
 
-  @patch('subprocess.run')
-  def test_create_operation(self, mock_run):
-      # Setup mock returns for all expected calls
-      mock_run.side_effect = [
-        MagicMock(stdout=""),           # exists check
-        MagicMock(stdout=""),           # running check
-        MagicMock(returncode=0),        # build command
-        MagicMock(returncode=0)         # run command
-      ]
-
-      # Test CREATE operation
-      self.docker.op = Op.CREATE
-      self.docker.run()
-
-      # Verify build and run commands were called (they will be calls 2 and 3)
-      build_call = mock_run.call_args_list[2][0][0]
-      self.assertEqual(build_call[0:2], ["docker", "build"])
-
-      run_call = mock_run.call_args_list[3][0][0]
-      self.assertEqual(run_call[0:2], ["docker", "run"])
+  def test_setup_link_template(self):
+    self.docker.link_tmpl = True
+    self.docker.setup()
+    self.assertTrue(os.path.samefile(self.docker.df, TMPL/"Dockerfile.template"))
 
-  @patch('subprocess.run')
-  def test_start_operation(self, mock_run):
-    # Setup for START operation
-    mock_run.side_effect = [
-      MagicMock(stdout="test-container\n"),  # exists check
-      MagicMock(stdout=""),                  # running check
-      MagicMock(returncode=0)               # start command
-    ]
-
-    self.docker.op = Op.START
-    self.docker.run()
+    # Falls back to a copy when linking fails (e.g. across filesystems)
+    shutil.rmtree(self.docker.dir)
+    with patch('os.link', side_effect=OSError), patch('shutil.copy2') as mock_copy:
+      self.docker.setup()
+    mock_copy.assert_called_once()
 
-    # Verify start command was called
-    start_call = mock_run.call_args_list[-1]
-    self.assertEqual(start_call[0][0], ["docker", "start", "test-container"])
+  def test_create_operation(self):
+    log = self.run_op(Op.CREATE)
+    self.assertEqual(log, [("build", "test-container"), ("run", "test-container")])
+    self.assertEqual(self.engine.images["test-container"], self.docker.fingerprint())
+    self.assertTrue(self.engine.containers["test-container"])
 
-  @patch('subprocess.run')
-  def test_stop_operation(self, mock_run):
-    # Setup for STOP operation
-    mock_run.side_effect = [
-      MagicMock(stdout="test-container\n"),  # exists check
-      MagicMock(stdout="test-container\n"),  # running check
-      MagicMock(returncode=0)               # stop command
-    ]
-
-    self.docker.op = Op.STOP
-    self.docker.run()
+  def test_build_cmd(self):
+    self.docker.setup()
+    cmd = self.docker.build_cmd("abc")
+    self.assertEqual(cmd[0:2], ["docker", "build"])
+    self.assertIn("drun.fp=abc", cmd)
+    self.assertFalse(any(a.startswith("--cache-to") for a in cmd))
+    self.assertNotIn("--load", cmd)
 
-    # Verify stop command was called
-    stop_call = mock_run.call_args_list[-1]
-    self.assertEqual(stop_call[0][0], ["docker", "stop", "test-container"])
+    self.docker.cache = "/tmp/drun-cache"
+    cmd = self.docker.build_cmd("abc")
+    self.assertIn("--cache-from=type=local,src=/tmp/drun-cache", cmd)
+    self.assertIn("--cache-to=type=local,dest=/tmp/drun-cache,mode=max", cmd)
+    self.assertIn("--load", cmd)
 
-  @patch('subprocess.run')
-  def test_reset_operation(self, mock_run):
-    # Setup for RESET operation
-    mock_run.side_effect = [
-      MagicMock(stdout="test-container\n"),  # exists check
-      MagicMock(stdout="test-container\n"),  # running check
-      MagicMock(returncode=0),              # stop command
-      MagicMock(returncode=0),              # build command
-      MagicMock(returncode=0)               # run command
-    ]
-
-    self.docker.op = Op.RESET
-    self.docker.run()
+  def test_create_skips_unchanged_build(self):
+    self.docker.setup()
+    log = self.run_op(Op.CREATE, images={"test-container": self.docker.fingerprint()})
+    self.assertEqual(log, [("run", "test-container")])
 
-    # Verify sequence of commands
-    calls = mock_run.call_args_list
-    self.assertEqual(calls[-3][0][0][0:2], ["docker", "stop"])
-    self.assertEqual(calls[-2][0][0][0:2], ["docker", "build"])
-    self.assertEqual(calls[-1][0][0][0:2], ["docker", "run"])
+    # Editing the Dockerfile changes the fingerprint
+    fp = self.docker.fingerprint()
+    self.docker.df.write_text(self.docker.df.read_text() + "\nRUN true\n")
+    self.assertNotEqual(self.docker.fingerprint(), fp)
 
-  @patch('subprocess.run')
-  def test_nuke_operation(self, mock_run):
-    # Setup for NUKE operation
-    mock_run.side_effect = [
-      MagicMock(stdout="test-container\n"),  # exists check
-      MagicMock(stdout="test-container\n"),  # running check
-      MagicMock(returncode=0),              # stop command
-      MagicMock(returncode=0),              # rmi command
-      MagicMock(returncode=0),              # build command
-      MagicMock(returncode=0)               # run command
-    ]
-
-    self.docker.op = Op.NUKE
-    self.docker.run()
+  def test_create_no_build(self):
+    self.docker.no_build = True
+    with patch.object(Docker, 'fingerprint') as mock_fp:
+      log = self.run_op(Op.CREATE, images={"test-container": "stale"})
+    mock_fp.assert_not_called()
+    self.assertEqual(log, [("run", "test-container")])
 
-    # Verify sequence of commands
-    calls = mock_run.call_args_list
-    self.assertEqual(calls[-4][0][0][0:2], ["docker", "stop"])
-    self.assertEqual(calls[-3][0][0][0:2], ["docker", "rmi"])
-    self.assertEqual(calls[-2][0][0][0:2], ["docker", "build"])
-    self.assertEqual(calls[-1][0][0][0:2], ["docker", "run"])
+  def test_start_operation(self):
+    log = self.run_op(Op.START, containers={"test-container": False})
+    self.assertEqual(log, [("start", "test-container")])
+    self.assertTrue(self.engine.containers["test-container"])
 
-  @patch('subprocess.run')
-  def test_clean_operation(self, mock_run):
-    # Setup for CLEAN operation
-    mock_run.side_effect = [
-      MagicMock(stdout="test-container\n"),  # exists check
-      MagicMock(stdout="test-container\n"),  # running check
-      MagicMock(returncode=0),              # sync command
-      MagicMock(returncode=0),              # cache clear command
-      MagicMock(returncode=0)               # restart command
-    ]
-
-    self.docker.op = Op.CLEAN
-    self.docker.run()
+  @patch('builtins.print')
+  def test_state_check_messages(self, mock_print):
+    self.run_op(Op.START, containers={"test-container": True})
+    mock_print.assert_called_with("Container test-container running")
+
+    self.engine.containers.clear()
+    self.run_op(Op.STOP)
+    mock_print.assert_called_with("Container test-container not found")
+    self.assertEqual([e for e in self.engine.log if e[0] != "state"], [])
+
+  @patch('builtins.print')
+  def test_messages_name_container(self, mock_print):
+    self.run_op(Op.START, containers={"test-container": False})
+    mock_print.assert_called_with("Operation 'start' on test-container completed!")
+
+  def test_stale_daemon_state_confirmed(self):
+    # Daemon still reports the container stopped; the engine says running
+    self.engine.cache = {"test-container": (True, False)}
+    log = self.run_op(Op.STOP, containers={"test-container": True})
+    self.assertEqual(log, [("stop", "test-container")])
+
+    # RESET re-checks before deciding whether to rm
+    self.engine.log.clear()
+    self.engine.cache = {"test-container": (False, False)}
+    log = self.run_op(Op.RESET, images={"test-container": ""})
+    self.assertEqual(log[0], ("rm", "test-container"))
 
-    # Verify cache clear and restart commands
-    calls = mock_run.call_args_list
-    self.assertEqual(calls[-3][0][0], ["docker", "exec", "test-container", "sync"])
-    self.assertEqual(calls[-1][0][0], ["docker", "restart", "test-container"])
+  def test_fresh_daemon_state_trusted(self):
+    self.engine.cache = {"test-container": (True, False)}
+    self.run_op(Op.START, containers={"test-container": False})
+    self.assertEqual(self.engine.log, [("start", "test-container")])
+
+  def test_stop_operation(self):
+    log = self.run_op(Op.STOP, containers={"test-container": True})
+    self.assertEqual(log, [("stop", "test-container")])
+    self.assertFalse(self.engine.containers["test-container"])
+
+  def test_reset_operation(self):
+    log = self.run_op(Op.RESET, containers={"test-container": True}, images={"test-container": ""})
+    self.assertEqual(log, [("rm", "test-container"), ("build", "test-container"),
+                           ("run", "test-container")])
+
+  def test_nuke_operation(self):
+    self.docker.setup()
+    log = self.run_op(Op.NUKE, containers={"test-container": True},
+                      images={"test-container": self.docker.fingerprint()})
+    self.assertEqual(log, [("rm", "test-container"), ("rmi", "test-container"),
+                           ("build", "test-container"), ("run", "test-container")])
+
+  def test_clean_operation(self):
+    log = self.run_op(Op.CLEAN, containers={"test-container": True})
+    self.assertEqual(log, [("exec", "test-container", "sync && echo 3 > /proc/sys/vm/drop_caches"),
+                           ("restart", "test-container")])
 
   def test_run_cmd_generation(self):
     # Test port forwarding
@@ -173,6 +201,14 @@ class TestDockerManager(unittest.TestCase):
     self.assertIn("-p", cmd)
     self.assertIn("8080:80", cmd)
     self.assertIn("2222:22", cmd)
+    self.assertEqual(cmd[5:9], ["-p", "8080:80", "-p", "2222:22"])
+
+    # Test host networking
+    self.docker.host_net = True
+    cmd = self.docker.run_cmd()
+    self.assertIn("--network=host", cmd)
+    self.assertNotIn("-p", cmd)
+    self.docker.host_net = False
 
     # Test root user
     self.docker.root = True
@@ -185,5 +221,290 @@ class TestDockerManager(unittest.TestCase):
     self.assertIn("-u", cmd)
     self.assertIn("testuser", cmd)
 
+class TestDefaults(unittest.TestCase):
+  def setUp(self):
+    defaults.cache_clear()
+    self.addCleanup(defaults.cache_clear)
+
+  def test_parsed_from_env(self):
+    with patch.dict(ENV, {"PORTS": "8080:80,,2222:22,", "DEBUG": "3", "ROOT": "1", "HOST_NET": "0"}):
+      d = defaults()
+    self.assertEqual(d.ports, ((8080, 80), (2222, 22)))
+    self.assertEqual((d.debug, d.root, d.host_net), (3, True, False))
+    self.assertEqual(Docker(name="x", op=Op.START, engine=FakeEngine()).debug, 3)
+
+    defaults.cache_clear()
+    with patch.dict(ENV, {"PORTS": ""}):
+      self.assertEqual(defaults().ports, ())
+
+  def test_bad_values_named(self):
+    with patch.dict(ENV, {"DEBUG": "x"}), self.assertRaisesRegex(ValueError, "DOCKER_DEBUG"):
+      defaults()
+    with patch.dict(ENV, {"PORTS": "8080"}), self.assertRaisesRegex(ValueError, "DOCKER_PORTS"):
+      defaults()
+
+class SlowEngine(FakeEngine):
+  """FakeEngine whose builds take a while and record how many overlap."""
+  def __init__(self):
+    super().__init__()
+    self.lock = threading.Lock()
+    self.active = self.peak = 0
+
+  def build(self, argv):
+    with self.lock:
+      self.active += 1
+      self.peak = max(self.peak, self.active)
+    time.sleep(0.05)
+    with self.lock:
+      super().build(argv)
+      self.active -= 1
+
+class TestMain(unittest.TestCase):
+  @patch('drun.run.Docker.run', autospec=True)
+  def test_multiple_containers(self, mock_run):
+    with patch.object(sys, 'argv', ["drun", "start", "a", "b", "a", "c"]):
+      main()
+    self.assertEqual(sorted(c[0][0].name for c in mock_run.call_args_list), ["a", "b", "c"])
+
+  @patch('drun.run.Daemon.serve')
+  def test_daemon_rejects_names(self, mock_serve):
+    with patch.object(sys, 'argv', ["drun", "daemon", "a"]), \
+         patch('sys.stderr'), self.assertRaises(SystemExit):
+      main()
+    mock_serve.assert_not_called()
+
+  @patch('os.cpu_count', return_value=2)
+  def test_run_all_concurrent(self, _):
+    engine = SlowEngine()
+    names = [f"drun-test-{i}" for i in range(4)]
+    with tempfile.TemporaryDirectory() as ws:
+      dockers = [Docker(name=n, op=Op.CREATE, ws=ws, engine=engine) for n in names]
+      try:
+        with patch('builtins.print'): asyncio.run(run_all(dockers))
+      finally:
+        for d in dockers: shutil.rmtree(d.dir, ignore_errors=True)
+    self.assertEqual(engine.containers, dict.fromkeys(names, True))
+    # Builds overlap, but never more than the semaphore allows
+    self.assertEqual(engine.peak, 2)
+
+class TestEngineCLI(unittest.TestCase):
+  def setUp(self):
+    # No daemon and no engine socket: everything goes through the docker CLI
+    for target in ('drun.run.api', 'drun.run.ask_daemon'):
+      p = patch(target, return_value=None)
+      p.start()
+      self.addCleanup(p.stop)
+    self.engine = Engine()
+
+  @patch('subprocess.run')
+  def test_state(self, mock_run):
+    mock_run.return_value = MagicMock(returncode=0, stdout="/test-container false\n")
+    self.assertEqual(self.engine.state("test-container"), (True, False))
+    # State comes from one by-name inspect, not a filtered 'docker ps' scan
+    mock_run.assert_called_once()
+    self.assertEqual(mock_run.call_args[0][0],
+      ["docker", "container", "inspect", "--format", "{{.Name}} {{.State.Running}}", "test-container"])
+
+    mock_run.return_value = MagicMock(returncode=0, stdout="/test-container true\n")
+    self.assertEqual(self.engine.state("test-container"), (True, True))
+
+    mock_run.return_value = MagicMock(returncode=1, stdout="")
+    self.assertEqual(self.engine.state("test-container"), (False, False))
+
+    # An ID-prefix match on another container is not ours
+    mock_run.return_value = MagicMock(returncode=0, stdout="/test-container-2 true\n")
+    self.assertEqual(self.engine.state("test-container"), (False, False))
+
+  @patch('subprocess.run')
+  def test_image_fp(self, mock_run):
+    mock_run.return_value = MagicMock(returncode=0, stdout="abc\n")
+    self.assertEqual(self.engine.image_fp("test-container"), "abc")
+    mock_run.return_value = MagicMock(returncode=1, stdout="")
+    self.assertIsNone(self.engine.image_fp("test-container"))
+
+  @patch('subprocess.run')
+  def test_ctl(self, mock_run):
+    self.engine.ctl("start", "test-container")
+    self.assertEqual(mock_run.call_args[0][0], ["docker", "start", "test-container"])
+    self.engine.ctl("rm", "test-container")
+    self.assertEqual(mock_run.call_args[0][0], ["docker", "rm", "-fv", "test-container"])
+
+  @patch('subprocess.run')
+  def test_cli_posix_spawn_conditions(self, mock_run):
+    # posix_spawn needs an executable with a directory part and close_fds=False
+    with patch('drun.run.DOCKER', "/usr/bin/docker"):
+      self.engine.ctl("stop", "test-container")
+    kw = mock_run.call_args[1]
+    self.assertEqual(kw["executable"], "/usr/bin/docker")
+    self.assertIs(kw["close_fds"], False)
+    self.assertEqual(mock_run.call_args[0][0][0], "docker")
+
+  @patch('subprocess.run')
+  def test_build_uses_buildkit(self, mock_run):
+    self.engine.build(["docker", "build", "."])
+    self.assertEqual(mock_run.call_args[1]["env"]["DOCKER_BUILDKIT"], "1")
+
+class TestEngineSock(unittest.TestCase):
+  def setUp(self):
+    self.cfg = tempfile.TemporaryDirectory()
+    self.addCleanup(self.cfg.cleanup)
+    env = patch.dict(os.environ, {"DOCKER_CONFIG": self.cfg.name})
+    env.start()
+    self.addCleanup(env.stop)
+    for k in ("DOCKER_HOST", "DOCKER_CONTEXT"): os.environ.pop(k, None)
+
+  def write_config(self, conf):
+    Path(self.cfg.name, "config.json").write_text(conf)
+
+  def test_default(self):
+    self.assertEqual(engine_sock(), "/var/run/docker.sock")
+    self.write_config('{"currentContext": "default"}')
+    self.assertEqual(engine_sock(), "/var/run/docker.sock")
+    self.write_config('not json')
+    self.assertEqual(engine_sock(), "/var/run/docker.sock")
+
+  def test_docker_host(self):
+    os.environ["DOCKER_HOST"] = "unix:///run/user/1000/docker.sock"
+    os.environ["DOCKER_CONTEXT"] = "rootless"
+    self.assertEqual(engine_sock(), "/run/user/1000/docker.sock")
+    os.environ["DOCKER_HOST"] = "tcp://10.0.0.1:2375"
+    self.assertIsNone(engine_sock())
+
+  def test_non_default_context_uses_cli(self):
+    os.environ["DOCKER_CONTEXT"] = "rootless"
+    self.assertIsNone(engine_sock())
+    del os.environ["DOCKER_CONTEXT"]
+    self.write_config('{"currentContext": "desktop-linux"}')
+    self.assertIsNone(engine_sock())
+
+  @patch('drun.run.SOCK', None)
+  def test_no_daemon_without_local_engine(self):
+    with patch('socket.socket') as mock_sock:
+      self.assertIsNone(ask_daemon("test-container"))
+    mock_sock.assert_not_called()
+
+class TestEngineAPI(unittest.TestCase):
+  def setUp(self):
+    daemon = patch('drun.run.ask_daemon', return_value=None)
+    daemon.start()
+    self.addCleanup(daemon.stop)
+    self.engine = Engine()
+
+  @patch('drun.run.api')
+  def test_state_from_single_inspect(self, mock_api):
+    mock_api.return_value = (200, {"Name": "/test-container", "State": {"Running": True}})
+    self.assertEqual(self.engine.state("test-container"), (True, True))
+    mock_api.assert_called_once_with("GET", "/containers/test-container/json")
+
+    mock_api.return_value = (200, {"Name": "/other", "State": {"Running": True}})
+    self.assertEqual(self.engine.state("test-container"), (False, False))
+
+    mock_api.return_value = (404, {"message": "No such container"})
+    self.assertEqual(self.engine.state("test-container"), (False, False))
+
+  @patch('subprocess.run')
+  @patch('drun.run.api')
+  def test_start_operation(self, mock_api, mock_run):
+    mock_api.side_effect = [(200, {"Name": "/test-container", "State": {"Running": False}}), (204, None)]
+    docker = Docker(name="test-container", op=Op.START, engine=self.engine)
+    with patch.object(docker, 'setup'): docker.run()
+    self.assertEqual(mock_api.call_args_list[-1], call("POST", "/containers/test-container/start"))
+    mock_run.assert_not_called()
+
+  @patch('subprocess.run')
+  @patch('drun.run.api')
+  def test_api_error(self, mock_api, mock_run):
+    mock_api.return_value = (500, {"message": "boom"})
+    with self.assertRaises(APIError): self.engine.ctl("stop", "test-container")
+    mock_run.assert_not_called()
+
+class TestDaemon(unittest.TestCase):
+  def test_event_tracking(self):
+    d = Daemon()
+    ev = lambda action, **attrs: {"Type": "container", "Action": action, "Actor": {"Attributes": attrs}}
+    d.apply(ev("create", name="web"))
+    self.assertEqual(d._states["web"], (True, False))
+    d.apply(ev("start", name="web"))
+    self.assertEqual(d._states["web"], (True, True))
+    d.apply(ev("exec_start: bash", name="web"))
+    self.assertEqual(d._states["web"], (True, True))
+    d.apply(ev("rename", name="api", oldName="/web"))
+    self.assertNotIn("web", d._states)
+    self.assertEqual(d._states["api"], (True, True))
+    d.apply(ev("die", name="api"))
+    self.assertEqual(d._states["api"], (True, False))
+    d.apply(ev("destroy", name="api"))
+    self.assertEqual(d._states, {})
+
+  def test_seed(self):
+    d = Daemon()
+    d.seed([{"Names": ["/" + state], "State": state}
+            for state in ("running", "paused", "restarting", "exited", "created")])
+    self.assertEqual(d._states, {
+      "running": (True, True), "paused": (True, True), "restarting": (True, True),
+      "exited": (True, False), "created": (True, False)})
+
+  @patch('builtins.print')
+  @patch('drun.run.SOCK', "/var/run/docker.sock")
+  @patch('drun.run.DSOCK', "/nonexistent/drun.sock")
+  def test_serve_without_engine(self, mock_print):
+    with patch('drun.run.SOCK', "/nonexistent/docker.sock"):
+      Daemon().serve()
+    self.assertIn("can't reach the engine", mock_print.call_args[0][0])
+
+    with patch('drun.run.UnixHTTPConnection'), patch('drun.run.api', return_value=None):
+      Daemon().serve()
+    self.assertIn("can't list containers", mock_print.call_args[0][0])
+
+  @patch('drun.run.SOCK', "/var/run/docker.sock")
+  @patch('builtins.print')
+  def test_serve_refuses_live_socket(self, mock_print):
+    with tempfile.TemporaryDirectory() as tmp, socket.socket(socket.AF_UNIX) as live:
+      path = os.path.join(tmp, "drun.sock")
+      live.bind(path)
+      live.listen()
+      with patch('drun.run.DSOCK', path), patch('drun.run.UnixHTTPConnection') as mock_conn:
+        Daemon().serve()
+      mock_conn.assert_not_called()
+      self.assertTrue(os.path.exists(path))
+    mock_print.assert_called_with(f"Daemon already running on {path}")
+
+  @patch('drun.run.SOCK', "/var/run/docker.sock")
+  @patch('drun.run.api', return_value=(200, []))
+  @patch('builtins.print')
+  def test_serve_stream_closed(self, mock_print, _):
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "drun.sock")
+      with socket.socket(socket.AF_UNIX) as stale: stale.bind(path)
+      with patch('drun.run.DSOCK', path), patch('drun.run.UnixHTTPConnection') as mock_conn:
+        mock_conn.return_value.getresponse.return_value = iter([])
+        Daemon().serve()
+      self.assertFalse(os.path.exists(path))
+    mock_print.assert_called_with("Engine event stream at /var/run/docker.sock closed, daemon exiting")
+
+  @patch('drun.run.SOCK', "/var/run/docker.sock")
+  def test_ask_daemon_checks_owner(self):
+    with patch('os.stat', return_value=MagicMock(st_uid=os.getuid() + 1)), \
+         patch('socket.socket') as mock_sock:
+      self.assertIsNone(ask_daemon("test-container"))
+    mock_sock.assert_not_called()
+
+  @patch('drun.run.SOCK', "/var/run/docker.sock")
+  def test_served_state(self):
+    d = Daemon()
+    d.seed([{"Names": ["/web"], "State": "running"}])
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "drun.sock")
+      srv = d.listen(path)
+      try:
+        with patch('drun.run.DSOCK', path):
+          self.assertEqual(ask_daemon("web"), (True, True))
+          self.assertEqual(ask_daemon("api"), (False, False))
+          d.apply({"Action": "die", "Actor": {"Attributes": {"name": "web"}}})
+          self.assertEqual(Engine().cached_state("web"), (True, False))
+      finally:
+        srv.shutdown()
+        srv.server_close()
+
 if __name__ == '__main__':
-  unittest.main(verbosity=2)
\ No newline at end of file
+  unittest.main(verbosity=2)